@@ -4,6 +4,7 @@ import os
 import pandas as pd
 
 _SUPPORT_CACHE_CSV = emoji.datafile('emoji_support.csv')
+_FALLBACK_SUPPORT_CACHE_CSV = emoji.datafile('emoji_fallback_support.csv')
 
 _API_LEVELS = {
   1: ("(no codename)", "1.0"),
@@ -70,6 +71,26 @@ def emoji_support():
   return (pd.read_csv(_SUPPORT_CACHE_CSV, converters={'cp_seq': ast.literal_eval})
           .rename(columns={'cp_seq': 'codepoints'}))
 
+def emoji_fallback_support():
+  """Dataframe of [emoji_level, api_level, font_file, codepoints, supported].
+
+  One row per sequence per api level, judged across that level's emoji
+  fonts in fallback order. font_file is the font the sequence resolved
+  to, empty if no emoji font maps it. supported is <NA> for levels whose
+  chain is incomplete because fonts.xml lists emoji fonts we don't have.
+
+  Requires prior execution of populate_emoji_support.py --fallback_chain"""
+
+  if not os.path.isfile(_FALLBACK_SUPPORT_CACHE_CSV):
+    raise IOError('Please run populate_emoji_support.py --fallback_chain first')
+  df = (pd.read_csv(_FALLBACK_SUPPORT_CACHE_CSV,
+                    converters={'cp_seq': ast.literal_eval},
+                    keep_default_na=False,
+                    na_values={'supported': ['']})
+        .rename(columns={'cp_seq': 'codepoints'}))
+  df.supported = df.supported.astype('boolean')
+  return df
+
 def font_summary():
   df = metadata()
   sf = (df
@@ -12,12 +12,15 @@ done;
 Some APIs assume harfbuzz compiled at ./harfbuzz.
 """
 import collections
+import font_cache
 import hashlib
+from lxml import etree
 import os
 import pandas
 import regex
 import subprocess
 import tempfile
+import unicodedata
 
 
 _LINE_FILTERS = {
@@ -65,10 +68,55 @@ def emoji_font(api_level):
   fonts = [f for f in os.listdir(dirpath)
            if 'Emoji' in f]
   if len(fonts) > 1:
-    raise IOError(f'Too many choices in {dirpath}: {fonts}')
+    raise IOError(f'Too many choices in {dirpath}: {fonts}'
+                  ', see emoji_fonts()')
   return os.path.abspath(os.path.join(dirpath, fonts[0])) if fonts else None
 
 
+def _emoji_font_chain(dirpath):
+  """(fonts, missing) filenames of the emoji fonts for dirpath.
+
+  fonts are present, in fallback order. missing are listed by the xml
+  but not present."""
+  present = sorted(f for f in os.listdir(dirpath) if 'Emoji' in f)
+
+  listed = []
+  for xml_file in ('fonts.xml', 'fallback_fonts.xml'):
+    xml_file = os.path.join(dirpath, xml_file)
+    if not os.path.isfile(xml_file):
+      continue
+    for el in etree.parse(xml_file).iter('font', 'file'):
+      filename = (el.text or '').strip()
+      if 'Emoji' in filename and filename not in listed:
+        listed.append(filename)
+    break
+
+  fonts = ([f for f in listed if f in present]
+           + [f for f in present if f not in listed])
+  missing = [f for f in listed if f not in present]
+  return fonts, missing
+
+
+def emoji_fonts(api_level):
+  """Emoji fonts present for api_level, in fallback order.
+
+  Order is taken from fonts.xml, or fallback_fonts.xml before 21. Fonts
+  the xml lists that we don't have are skipped, see missing_emoji_fonts().
+  Fonts we have that it doesn't list go last, alphabetically. With no xml
+  (33+) that is the whole order."""
+  dirpath = datafile(f'./api_level/{api_level}/')
+  fonts, _ = _emoji_font_chain(dirpath)
+  return [os.path.abspath(os.path.join(dirpath, f)) for f in fonts]
+
+
+def missing_emoji_fonts(api_level):
+  """Emoji fonts the xml for api_level lists that we don't have.
+
+  If any, emoji_fonts() is not the chain a device uses."""
+  _, missing = _emoji_font_chain(datafile(f'./api_level/{api_level}/'))
+  return missing
+
+
 def _parse_emoji_test(filename):
   result = []
 
@@ -166,7 +214,39 @@ def metadata():
   return df
 
 
+def _missing_from_cmap(font, cp_seq):
+  """True if cp_seq has a symbol the font cannot possibly map.
+
+  Only trusts symbols with no decomposition; anything else could
+  still be resolved by the shaper."""
+  cmap = font.cmap()
+  return any(cp not in cmap
+             and unicodedata.category(chr(cp)) == 'So'
+             and not unicodedata.decomposition(chr(cp))
+             for cp in cp_seq)
+
+
 def supports(font_file, cp_seq):
+  """Whether font_file shapes cp_seq to a single real glyph.
+
+  May be decided from cmap alone, without running hb-shape: a sequence
+  with a symbol (category So, no decomposition) the font doesn't map is
+  unsupported. Results are memoized per font content."""
+  font = font_cache.get(font_file)
+  cp_seq = tuple(cp_seq)
+  shapes = font_cache.memo('shapes', font)
+  result = shapes.get(cp_seq, None)
+  if result is None:
+    result = _shape_supports(font, cp_seq)
+    shapes[cp_seq] = result
+  return result
+
+
+def _shape_supports(font, cp_seq):
+  # a symbol that isn't in cmap shapes to notdef, no need to ask hb
+  if _missing_from_cmap(font, cp_seq):
+    return False
+
   cmd = [
     './harfbuzz/util/hb-shape',
     '--no-glyph-names',
@@ -175,7 +255,7 @@ def supports(font_file, cp_seq):
     '--no-clusters',
     "-u",
     " ".join(("%x" % c for c in cp_seq)),
-    font_file,
+    font.path,
   ]
 
   shape_result = subprocess.run(cmd, capture_output=True, text=True)
@@ -195,6 +275,27 @@ def supports(font_file, cp_seq):
   return len(cps) == 1 and 0 not in cps
 
 
+def fallback_font(font_files, cp_seq):
+  """The font in font_files Android would use for cp_seq, None if none.
+
+  Like minikin, the first font whose cmap has the leading codepoint
+  gets the whole sequence."""
+  for font_file in font_files:
+    if cp_seq[0] in font_cache.get(font_file).cmap():
+      return font_file
+  return None
+
+
+def fallback_supports(font_files, cp_seq):
+  """(font_file, supported) for cp_seq given the ordered fallback chain.
+
+  font_file is what fallback_font picks, None if nothing maps cp_seq.
+  Only shapes in that font."""
+  font_file = fallback_font(font_files, cp_seq)
+  supported = font_file is not None and supports(font_file, cp_seq)
+  return font_file, supported
+
+
 def render(font_file, cp_seq, dest_file):
   cmd = [
     './harfbuzz/util/hb-view',
@@ -211,12 +312,19 @@ def render(font_file, cp_seq, dest_file):
 
 
 def hash_of_render(font_file, cp_seq):
-  with tempfile.NamedTemporaryFile() as tmp_file:
-    render(font_file, cp_seq, tmp_file.name)
-    with open(tmp_file.name, 'rb') as tmp_reader:
-      hash = hashlib.md5()
-      hash.update(tmp_reader.read())
-      return hash.digest()
+  font = font_cache.get(font_file)
+  cp_seq = tuple(cp_seq)
+  render_hashes = font_cache.memo('render_hashes', font)
+  result = render_hashes.get(cp_seq, None)
+  if result is None:
+    with tempfile.NamedTemporaryFile() as tmp_file:
+      render(font.path, cp_seq, tmp_file.name)
+      with open(tmp_file.name, 'rb') as tmp_reader:
+        hash = hashlib.md5()
+        hash.update(tmp_reader.read())
+        result = hash.digest()
+    render_hashes[cp_seq] = result
+  return result
 
 
 def codepoints(filename):
@@ -1,5 +1,6 @@
 
 import emoji
+import font_cache
 import itertools
 from itertools import chain
 import os
@@ -63,6 +64,31 @@ def test_supports(cp_seq, api_level, expected_result):
   assert emoji.supports(filename, cp_seq) == expected_result
 
 
+@pytest.mark.parametrize(
+  "cp_seq, expected_result",
+  [
+    ((0x1F600,), True),
+    ((0x1F469, 0x200D, 0x1F680), True),
+    # not symbols, hb could still hide or compose them
+    ((0x200D,), False),
+    ((0xFE0F,), False),
+    ((0x20E3,), False),
+    ((0xE0067,), False),
+    # a symbol, but one with a decomposition
+    ((0x2122,), False),
+  ],
+)
+def test_missing_from_cmap(cp_seq, expected_result):
+  font = font_cache.get(emoji.datafile('api_level/33/NotoColorEmojiFlags.ttf'))
+  assert emoji._missing_from_cmap(font, cp_seq) == expected_result
+
+
+def test_supports_from_cmap():
+  # no hb-shape needed, the flags font doesn't map U+1F600
+  font_file = emoji.datafile('api_level/33/NotoColorEmojiFlags.ttf')
+  assert emoji.supports(font_file, (0x1F600,)) is False
+
+
 @pytest.mark.parametrize(
   "filename, expected_result",
   [
@@ -125,3 +151,53 @@ def test_hash_of_render(cp_seq, expected_groups):
                    itertools.groupby(hashes, key=lambda t: t[1])]
   assert actual_groups == expected_groups
 
+
+@pytest.mark.parametrize(
+  "api_level, expected_result",
+  [
+    (16, ['AndroidEmoji.ttf']),
+    (21, ['NotoColorEmoji.ttf']),
+    # no fonts.xml, alphabetical
+    (33, ['NotoColorEmoji.ttf', 'NotoColorEmojiFlags.ttf']),
+  ],
+)
+def test_emoji_fonts(api_level, expected_result):
+  filenames = [os.path.basename(f) for f in emoji.emoji_fonts(api_level)]
+  assert filenames == expected_result
+
+
+def test_emoji_font_chain(tmp_path):
+  (tmp_path / 'fonts.xml').write_text("""<familyset>
+    <family><font>Roboto-Regular.ttf</font></family>
+    <family lang="und-Zsye"><font>NotoColorEmoji.ttf</font></family>
+    <family lang="und-Zsye"><font>NotoColorEmojiFlags.ttf</font></family>
+</familyset>""")
+  for filename in ('Roboto-Regular.ttf', 'NotoColorEmojiFlags.ttf',
+                   'AndroidEmoji.ttf'):
+    (tmp_path / filename).touch()
+  # listed order first, unlisted after; listed but absent is reported
+  assert emoji._emoji_font_chain(str(tmp_path)) == (
+    ['NotoColorEmojiFlags.ttf', 'AndroidEmoji.ttf'],
+    ['NotoColorEmoji.ttf'],
+  )
+
+
+@pytest.mark.parametrize(
+  "cp_seq, expected_result",
+  [
+    ((0x1F44D,), 'NotoColorEmoji.ttf'),
+    ((0x1f1fa, 0x1f1f8), 'NotoColorEmojiFlags.ttf'),  # US
+    # England, a tag sequence rather than regional indicators
+    ((0x1f3f4, 0xe0067, 0xe0062, 0xe0065, 0xe006e, 0xe0067, 0xe007f),
+     'NotoColorEmoji.ttf'),
+    ((0x1D11E,), None),  # G clef, not an emoji
+  ],
+)
+def test_fallback_font(cp_seq, expected_result):
+  font_file = emoji.fallback_font(emoji.emoji_fonts(33), cp_seq)
+  filename = os.path.basename(font_file) if font_file else None
+  assert filename == expected_result
+
+
+def test_fallback_supports_unmapped():
+  assert emoji.fallback_supports(emoji.emoji_fonts(33), (0x1D11E,)) == (None, False)
@@ -0,0 +1,175 @@
+"""Process-wide cache of opened fonts.
+
+Emoji fonts are multi-megabyte and the same handful get asked about
+thousands of times by populate_emoji_support.py, make_assets.py and the
+tests. Entries are keyed on (path, mtime, size) so edits to a font on disk
+are picked up, hold the file memory-mapped plus whatever has been parsed
+from it, and are dropped least recently used first once the mapped bytes
+exceed a configurable cap.
+
+Also home to memos of shaping and render hashes, keyed on the md5 of the
+font bytes so byte-identical copies shipped at several api levels share
+results. Memos outlive eviction of the font, they are only a few bytes
+per sequence.
+"""
+import collections
+import hashlib
+import mmap
+import os
+import threading
+from fontTools import ttLib
+
+
+_DEFAULT_MAX_BYTES = 512 * pow(2, 20)
+
+CacheStats = collections.namedtuple(
+  'CacheStats',
+  ['hits', 'misses', 'evictions', 'entries', 'size_bytes', 'max_bytes'])
+
+
+def _key(font_file):
+  path = os.path.realpath(font_file)
+  stat = os.stat(path)
+  return (path, stat.st_mtime_ns, stat.st_size)
+
+
+class CachedFont:
+  """An opened font. Parsed data is loaded on first use."""
+
+  def __init__(self, key):
+    self.key = key
+    self.path = key[0]
+    with open(self.path, 'rb') as f:
+      self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    self._lock = threading.Lock()
+    self._ttfont = None
+    self._cmap = None
+    self._digest = None
+
+  @property
+  def size(self):
+    return len(self.data)
+
+  def ttfont(self):
+    """fontTools TTFont reading lazily from the mapped bytes."""
+    with self._lock:
+      if self._ttfont is None:
+        self._ttfont = ttLib.TTFont(self.data, fontNumber=0, lazy=True)
+      return self._ttfont
+
+  def cmap(self):
+    """frozenset of codepoints mapped by the font."""
+    if self._cmap is None:
+      best_cmap = self.ttfont().getBestCmap() or {}
+      self._cmap = frozenset(best_cmap.keys())
+    return self._cmap
+
+  def digest(self):
+    """md5 of the font bytes."""
+    if self._digest is None:
+      self._digest = hashlib.md5(self.data).digest()
+    return self._digest
+
+
+class FontCache:
+  """LRU of CachedFont, bounded by total file size.
+
+  max_bytes covers the mapped file bytes only, not parsed TTFont tables
+  or memos. Evicted entries are dropped, not closed; the mapping goes away
+  once nothing else references the CachedFont. The most recently used font
+  is always retained, even if it alone exceeds max_bytes."""
+
+  def __init__(self, max_bytes=_DEFAULT_MAX_BYTES):
+    self._lock = threading.Lock()
+    self._fonts = collections.OrderedDict()  # path => CachedFont
+    self._size_bytes = 0
+    self._max_bytes = max_bytes
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+    self._memos = {}  # (name, digest) => {cp_seq: result}
+
+  def get(self, font_file):
+    key = _key(font_file)
+    path = key[0]
+    with self._lock:
+      font = self._fonts.get(path, None)
+      if font is not None and font.key == key:
+        self._fonts.move_to_end(path)
+        self._hits += 1
+        return font
+      self._misses += 1
+      if font is not None:
+        # stale, the file changed on disk
+        self._remove(path)
+
+    font = CachedFont(key)
+
+    with self._lock:
+      existing = self._fonts.get(path, None)
+      if existing is not None and existing.key == key:
+        # another thread got there first
+        self._fonts.move_to_end(path)
+        return existing
+      if existing is not None:
+        self._remove(path)
+      self._fonts[path] = font
+      self._size_bytes += font.size
+      self._evict()
+    return font
+
+  def _remove(self, path):
+    font = self._fonts.pop(path)
+    self._size_bytes -= font.size
+
+  def _evict(self):
+    while self._size_bytes > self._max_bytes and len(self._fonts) > 1:
+      path = next(iter(self._fonts))
+      self._remove(path)
+      self._evictions += 1
+
+  def set_max_bytes(self, max_bytes):
+    with self._lock:
+      self._max_bytes = max_bytes
+      self._evict()
+
+  def memo(self, name, font):
+    """Dict of results called name shared by all fonts with font's bytes."""
+    key = (name, font.digest())
+    with self._lock:
+      return self._memos.setdefault(key, {})
+
+  def clear(self):
+    with self._lock:
+      self._fonts.clear()
+      self._memos.clear()
+      self._size_bytes = 0
+
+  def stats(self):
+    with self._lock:
+      return CacheStats(self._hits, self._misses, self._evictions,
+                        len(self._fonts), self._size_bytes, self._max_bytes)
+
+
+_CACHE = FontCache()
+
+
+def get(font_file):
+  """CachedFont for font_file from the process-wide cache."""
+  return _CACHE.get(font_file)
+
+
+def set_max_bytes(max_bytes):
+  _CACHE.set_max_bytes(max_bytes)
+
+
+def memo(name, font):
+  return _CACHE.memo(name, font)
+
+
+def stats():
+  return _CACHE.stats()
+
+
+def clear():
+  _CACHE.clear()
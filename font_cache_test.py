@@ -0,0 +1,68 @@
+
+import emoji
+import font_cache
+import os
+import pytest
+import shutil
+
+
+_FLAGS_FONT = emoji.datafile('api_level/31/NotoColorEmojiFlags.ttf')
+_EMOJI_FONT = emoji.datafile('api_level/21/NotoColorEmoji.ttf')
+
+
+def test_hit_and_miss():
+  cache = font_cache.FontCache()
+  font = cache.get(_FLAGS_FONT)
+  assert cache.get(_FLAGS_FONT) is font
+  assert cache.get(os.path.relpath(_FLAGS_FONT)) is font
+  stats = cache.stats()
+  assert (stats.hits, stats.misses, stats.entries) == (2, 1, 1)
+  assert stats.size_bytes == os.stat(_FLAGS_FONT).st_size
+
+
+def test_lru_eviction():
+  flags_size = os.stat(_FLAGS_FONT).st_size
+  cache = font_cache.FontCache(max_bytes=flags_size)
+  flags_font = cache.get(_FLAGS_FONT)
+  # over the cap, but the most recent font is always kept
+  cache.get(_EMOJI_FONT)
+  stats = cache.stats()
+  assert (stats.entries, stats.evictions) == (1, 1)
+  assert cache.get(_FLAGS_FONT) is not flags_font
+  assert cache.stats().misses == 3
+
+
+def test_invalidated_on_change(tmp_path):
+  font_file = str(tmp_path / 'font.ttf')
+  shutil.copy(_FLAGS_FONT, font_file)
+  cache = font_cache.FontCache()
+  font = cache.get(font_file)
+  os.utime(font_file, ns=(0, 0))
+  assert cache.get(font_file) is not font
+  stats = cache.stats()
+  assert (stats.hits, stats.misses, stats.entries) == (0, 2, 1)
+
+
+@pytest.mark.parametrize(
+  "font_file, codepoint, expected_result",
+  [
+    (_FLAGS_FONT, 0x1F1E6, True),  # regional indicator A
+    (_FLAGS_FONT, 0x1F600, False),
+    (_EMOJI_FONT, 0x1F44D, True),
+    (_EMOJI_FONT, 0x1F9B5, False),
+  ],
+)
+def test_cmap(font_file, codepoint, expected_result):
+  assert (codepoint in font_cache.FontCache().get(font_file).cmap()) == expected_result
+
+
+def test_memo_shared_by_identical_fonts():
+  cache = font_cache.FontCache()
+  font_16 = cache.get(emoji.datafile('api_level/16/AndroidEmoji.ttf'))
+  font_17 = cache.get(emoji.datafile('api_level/17/AndroidEmoji.ttf'))
+  font_19 = cache.get(emoji.datafile('api_level/19/AndroidEmoji.ttf'))
+  assert font_16 is not font_17
+  cache.memo('shapes', font_16)[(0x263A,)] = True
+  assert cache.memo('shapes', font_17) == {(0x263A,): True}
+  assert cache.memo('shapes', font_19) == {}
+  assert cache.memo('render_hashes', font_17) == {}
@@ -0,0 +1,109 @@
+"""Measures throughput of support_server.py on one machine.
+
+By default starts the server in-process on a free port, then fires batched
+/supports requests at it from several client threads. Pass --url to point
+at an already running server instead.
+
+Queries are drawn from emoji.metadata() and the server's /levels so the
+script does not need the support csv itself when --url is given.
+
+  python3 load_test_support_server.py --threads 8 --requests 2000 --batch_size 50
+"""
+from absl import app
+from absl import flags
+import emoji
+import json
+import random
+import support_server
+import threading
+import time
+import urllib.request
+
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string('url', None,
+                    'Base url of a running server, e.g. http://localhost:8080.'
+                    ' If unset a server is started in-process.')
+flags.DEFINE_integer('threads', 8, 'Number of concurrent clients.')
+flags.DEFINE_integer('requests', 1000, 'Total number of requests to send.')
+flags.DEFINE_integer('batch_size', 50, 'Lookups per request.')
+flags.DEFINE_integer('seed', 0, 'Random seed for the query mix.')
+
+
+def _queries(api_levels, num_batches, batch_size):
+  rng = random.Random(FLAGS.seed)
+  df = emoji.metadata()
+  cp_seqs = list(df[df.status == 'fully-qualified'].codepoints)
+  return [
+    json.dumps({'queries': [
+      {
+        'codepoints': ' '.join('%x' % c for c in rng.choice(cp_seqs)),
+        'api_level': rng.choice(api_levels),
+      }
+      for _ in range(batch_size)
+    ]}).encode('utf-8')
+    for _ in range(num_batches)
+  ]
+
+
+def _client(url, bodies, latencies):
+  for body in bodies:
+    request = urllib.request.Request(url + '/supports', data=body,
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+      response.read()
+    latencies.append(time.perf_counter() - start)
+
+
+def _percentile(sorted_values, fraction):
+  return sorted_values[min(len(sorted_values) - 1,
+                           int(fraction * len(sorted_values)))]
+
+
+def main(_):
+  server = None
+  url = FLAGS.url
+  if url is None:
+    index = support_server.SupportIndex.load()
+    server = support_server.make_server(index, 'localhost', 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://%s:%d' % server.server_address[:2]
+  url = url.rstrip('/')
+
+  with urllib.request.urlopen(url + '/levels') as response:
+    api_levels = sorted(int(l) for l in json.loads(response.read()))
+  bodies = _queries(api_levels, FLAGS.requests, FLAGS.batch_size)
+  latencies = [[] for _ in range(FLAGS.threads)]
+  clients = [threading.Thread(target=_client,
+                              args=(url, bodies[i::FLAGS.threads], latencies[i]))
+             for i in range(FLAGS.threads)]
+
+  start = time.perf_counter()
+  for client in clients:
+    client.start()
+  for client in clients:
+    client.join()
+  elapsed = time.perf_counter() - start
+
+  latencies = sorted(l for per_client in latencies for l in per_client)
+  print(f'{len(latencies)} requests, {len(latencies) * FLAGS.batch_size} lookups'
+        f' in {elapsed:.2f}s using {FLAGS.threads} threads')
+  print(f'{len(latencies) / elapsed:.0f} requests/s,'
+        f' {len(latencies) * FLAGS.batch_size / elapsed:.0f} lookups/s')
+  for fraction in (0.5, 0.9, 0.99):
+    print(f'client p{int(fraction * 100)}:'
+          f' {_percentile(latencies, fraction) * 1000:.2f}ms')
+
+  with urllib.request.urlopen(url + '/latency') as response:
+    print('server latency:')
+    print(json.dumps(json.loads(response.read()), indent=2))
+
+  if server:
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -4,13 +4,17 @@ Saves time when running utilities that use the data.
 Takes ~30M to rebuild from scratch.
 Specify --font_file api_level/##/NotoColorEmoji.ttf to update
 a single emoji file.
+Specify --fallback_chain to instead evaluate each api level's emoji fonts
+as an ordered fallback chain, the way a device would.
 """
 from absl import app
 from absl import flags
 import android_fonts
 import base64
 import emoji
+import font_cache
 from operator import itemgetter
+import os
 import pandas as pd
 
 
@@ -21,6 +25,13 @@ flags.DEFINE_string('font_file', None,
                     ' Any existing entries for this path will be removed.'
                     ' New entries will be generated for this font.'
                     ' Entries for any other file will be untouched.')
+flags.DEFINE_boolean('fallback_chain', False,
+                     'Write per api level support across the ordered emoji'
+                     ' fallback chain, rather than per font file.')
+flags.DEFINE_integer('font_cache_mb', 512,
+                     'Cap on memory-mapped font file bytes kept between'
+                     ' lookups; least recently used fonts are dropped first.'
+                     ' Parsed tables and memoized results are not counted.')
 
 
 def _build_dataset():
@@ -57,10 +68,58 @@ def _build_dataset():
   return df
 
 
+def _build_fallback_dataset():
+  emoji_meta = emoji.metadata()
+  emoji_levels = sorted(emoji_meta['emoji_level'].unique())
+
+  api_levels = sorted(set(android_fonts.metadata().api_level))
+
+  # a partial chain would claim False for whatever the missing fonts cover
+  incomplete = {}
+  for api_level in api_levels:
+    missing = emoji.missing_emoji_fonts(api_level)
+    if missing:
+      incomplete[api_level] = missing
+      print(f'WARNING: api level {api_level} is missing {missing},'
+            ' its support is recorded as unknown')
+
+  support = []
+  for emoji_level in emoji_levels:
+    cp_seqs = emoji_meta[emoji_meta.emoji_level == emoji_level].codepoints
+    for api_level in api_levels:
+      if api_level in incomplete:
+        support.extend((emoji_level, api_level, '', cp_seq, None)
+                       for cp_seq in cp_seqs)
+        continue
+      font_files = emoji.emoji_fonts(api_level)
+      if not font_files:
+        continue
+      print(f'Working on emoji {emoji_level}, api level {api_level}...')
+      for cp_seq in cp_seqs:
+        font_file, supported = emoji.fallback_supports(font_files, cp_seq)
+        font_file = os.path.relpath(font_file) if font_file else ''
+        support.append((emoji_level, api_level, font_file, cp_seq, supported))
+
+  support.sort(key=itemgetter(0, 1, 3))
+  df = pd.DataFrame(support)
+  df.columns=['emoji_level', 'api_level', 'font_file', 'cp_seq', 'supported']
+
+  return df
+
+
 def main(_):
-  df = _build_dataset()
-  df.to_csv(android_fonts._SUPPORT_CACHE_CSV, index=False)
-  print(f'Wrote {android_fonts._SUPPORT_CACHE_CSV}')
+  font_cache.set_max_bytes(FLAGS.font_cache_mb * pow(2, 20))
+  if FLAGS.fallback_chain:
+    if FLAGS.font_file:
+      raise app.UsageError('--font_file does not apply to --fallback_chain')
+    df = _build_fallback_dataset()
+    dest = android_fonts._FALLBACK_SUPPORT_CACHE_CSV
+  else:
+    df = _build_dataset()
+    dest = android_fonts._SUPPORT_CACHE_CSV
+  print(f'Font cache: {font_cache.stats()}')
+  df.to_csv(dest, index=False)
+  print(f'Wrote {dest}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,280 @@
+"""Serves emoji support lookups over HTTP from an in-memory index.
+
+Loads the support data, level metadata and api levels once at startup so
+that callers can ask "can this emoji render on api level N?" without
+pulling in pandas or re-reading the csv per question.
+
+Requires prior execution of populate_emoji_support.py.
+
+Endpoints:
+
+  POST /supports  {"queries": [{"codepoints": "1f469 1f3fb", "api_level": 28}, ...]}
+                  -> {"results": [{"codepoints": [...], "api_level": 28,
+                                   "supported": true}, ...]}
+                  supported is null if the sequence is not in the dataset
+                  or the api level is unknown; the rest of the batch is
+                  still answered. Malformed queries fail the whole request
+                  with a 400 naming the index of the bad query.
+                  Bodies over _MAX_BODY_BYTES are rejected with a 413.
+  GET /levels     api level name, version and font summary.
+  GET /latency    histogram of request handling latency, per path.
+
+Run with:
+
+  python3 support_server.py --port 8080
+"""
+from absl import app
+from absl import flags
+import android_fonts
+import bisect
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import regex
+import threading
+import time
+
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string('host', 'localhost', 'Interface to listen on.')
+flags.DEFINE_integer('port', 8080, 'Port to listen on, 0 to pick any free port.')
+
+# Upper bounds, in microseconds, of the latency histogram buckets.
+# Anything slower lands in a final overflow bucket.
+_LATENCY_BUCKETS_US = tuple(2 ** i for i in range(4, 24))
+
+_MAX_BATCH = 10000
+# Generous per query allowance, a query is typically ~50 bytes of json.
+_MAX_BODY_BYTES = _MAX_BATCH * 256
+
+
+class SupportIndex:
+  """In-memory answers to support questions.
+
+  Built from the frame android_fonts.emoji_detail() returns and
+  the frame android_fonts.font_summary() returns.
+
+  Any api level with support data is known, even if api_levels lacks
+  it; such levels get a null name and version."""
+
+  def __init__(self, detail, font_summary, api_levels):
+    supported = collections.defaultdict(set)
+    for codepoints, api_level, is_supported in zip(detail.codepoints,
+                                                   detail.api_level,
+                                                   detail.supported):
+      levels = supported[tuple(codepoints)]
+      if is_supported:
+        levels.add(int(api_level))
+    self._supported = {cp_seq: frozenset(levels)
+                       for cp_seq, levels in supported.items()}
+
+    fonts = {int(rec['api_level']): {k: v for k, v in rec.items()
+                                     if k != 'api_level'}
+             for rec in json.loads(font_summary.to_json(orient='records'))}
+    known_levels = set(api_levels) | {int(l) for l in detail.api_level}
+    self._levels = {}
+    for api_level in sorted(known_levels):
+      name, version = api_levels.get(api_level, (None, None))
+      self._levels[api_level] = {
+        'name': name,
+        'version': version.strip() if version else None,
+        'fonts': fonts.get(api_level),
+      }
+
+  @classmethod
+  def load(cls):
+    return cls(android_fonts.emoji_detail(),
+               android_fonts.font_summary(),
+               android_fonts.api_levels())
+
+  def levels(self):
+    return self._levels
+
+  def num_sequences(self):
+    return len(self._supported)
+
+  def sequences(self):
+    return self._supported.keys()
+
+  def supports(self, cp_seq, api_level):
+    """True/False if we know whether api_level renders cp_seq, else None."""
+    if api_level not in self._levels:
+      return None
+    levels = self._supported.get(tuple(cp_seq), None)
+    if levels is None:
+      return None
+    return api_level in levels
+
+
+class LatencyHistogram:
+  """Thread-safe fixed bucket latency histogram."""
+
+  def __init__(self, bounds_us=_LATENCY_BUCKETS_US):
+    self._bounds_us = bounds_us
+    self._lock = threading.Lock()
+    self._counts = collections.defaultdict(lambda: [0] * (len(bounds_us) + 1))
+
+  def record(self, name, seconds):
+    bucket = bisect.bisect_left(self._bounds_us, seconds * 1e6)
+    with self._lock:
+      self._counts[name][bucket] += 1
+
+  def _percentile(self, counts, total, fraction):
+    threshold = fraction * total
+    running = 0
+    for bound_us, count in zip(self._bounds_us + (None,), counts):
+      running += count
+      if running >= threshold:
+        return bound_us
+    return None
+
+  def snapshot(self):
+    """{name: {count, p50_us, p90_us, p99_us, buckets}}.
+
+    Percentiles are bucket upper bounds, null if in the overflow bucket."""
+    with self._lock:
+      counts = {name: list(c) for name, c in self._counts.items()}
+    result = {}
+    for name, c in sorted(counts.items()):
+      total = sum(c)
+      result[name] = {
+        'count': total,
+        'p50_us': self._percentile(c, total, 0.5),
+        'p90_us': self._percentile(c, total, 0.9),
+        'p99_us': self._percentile(c, total, 0.99),
+        'buckets': [{'le_us': bound_us, 'count': count}
+                    for bound_us, count in zip(self._bounds_us + (None,), c)
+                    if count],
+      }
+    return result
+
+
+def _is_int(value):
+  # json true/false arrive as bool, which is an int subclass
+  return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_codepoints(value):
+  """Accepts [0x1f469, 0x1f3fb] or '1f469 1f3fb' / '1f469_1f3fb'."""
+  if isinstance(value, str):
+    parts = [p for p in regex.split(r'[\s_,]+', value.strip()) if p]
+    if not parts:
+      raise ValueError(f'No codepoints in "{value}"')
+    cp_seq = tuple(int(p, 16) for p in parts)
+  elif isinstance(value, list) and value and all(_is_int(v) for v in value):
+    cp_seq = tuple(value)
+  else:
+    raise ValueError(f'Unable to parse codepoints from {value!r}')
+  if not all(0 <= cp <= 0x10FFFF for cp in cp_seq):
+    raise ValueError(f'Codepoint out of range in {value!r}')
+  return cp_seq
+
+
+class _Handler(BaseHTTPRequestHandler):
+  # set by make_server
+  index = None
+  latency = None
+
+  def _send_json(self, status, body):
+    data = json.dumps(body).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def _timed(self, fn):
+    start = time.perf_counter()
+    try:
+      status, body = fn()
+    except ValueError as e:
+      status, body = 400, {'error': str(e)}
+    self._send_json(status, body)
+    self.latency.record(f'{self.command} {self.path}',
+                        time.perf_counter() - start)
+
+  def _supports(self):
+    try:
+      length = int(self.headers.get('Content-Length', 0))
+    except ValueError:
+      raise ValueError('Bad Content-Length')
+    if length < 0:
+      raise ValueError('Bad Content-Length')
+    if length > _MAX_BODY_BYTES:
+      return 413, {'error': f'At most {_MAX_BODY_BYTES} bytes per request'}
+    try:
+      request = json.loads(self.rfile.read(length))
+    except json.JSONDecodeError as e:
+      raise ValueError(f'Bad json: {e}')
+    queries = request.get('queries') if isinstance(request, dict) else None
+    if not isinstance(queries, list):
+      raise ValueError('Expected {"queries": [...]}')
+    if len(queries) > _MAX_BATCH:
+      raise ValueError(f'At most {_MAX_BATCH} queries per request')
+
+    results = []
+    for i, query in enumerate(queries):
+      if not isinstance(query, dict):
+        raise ValueError(f'Bad query {i}: {query!r}')
+      try:
+        cp_seq = parse_codepoints(query.get('codepoints'))
+      except ValueError as e:
+        raise ValueError(f'Bad query {i}: {e}')
+      api_level = query.get('api_level')
+      if not _is_int(api_level):
+        raise ValueError(f'Bad query {i}: bad api_level in {query!r}')
+      results.append({
+        'codepoints': list(cp_seq),
+        'api_level': api_level,
+        'supported': self.index.supports(cp_seq, api_level),
+      })
+    return 200, {'results': results}
+
+  def do_GET(self):
+    if self.path == '/levels':
+      self._timed(lambda: (200, self.index.levels()))
+    elif self.path == '/latency':
+      self._send_json(200, self.latency.snapshot())
+    else:
+      self._send_json(404, {'error': f'No such path {self.path}'})
+
+  def do_POST(self):
+    if self.path == '/supports':
+      self._timed(self._supports)
+    else:
+      self._send_json(404, {'error': f'No such path {self.path}'})
+
+  def log_message(self, format, *args):
+    # per-request logging to stderr dominates the cost of a lookup
+    pass
+
+
+def make_server(index, host, port):
+  """ThreadingHTTPServer answering from index; call serve_forever() on it."""
+  handler = type('Handler', (_Handler,), {
+    'index': index,
+    'latency': LatencyHistogram(),
+  })
+  return ThreadingHTTPServer((host, port), handler)
+
+
+def main(_):
+  start = time.perf_counter()
+  index = SupportIndex.load()
+  print(f'Loaded {index.num_sequences()} sequences'
+        f' in {time.perf_counter() - start:.1f}s')
+
+  server = make_server(index, FLAGS.host, FLAGS.port)
+  host, port = server.server_address[:2]
+  print(f'Serving on http://{host}:{port}/')
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,164 @@
+
+import http.client
+import json
+import pandas as pd
+import pytest
+import support_server
+import threading
+import urllib.error
+import urllib.request
+
+
+def _index():
+  detail = pd.DataFrame([
+    ((0x1f970,), 27, 0),
+    ((0x1f970,), 28, 1),
+    ((0x263A,), 21, 1),
+    ((0x263A,), 28, 1),
+    ((0x1f970,), 33, 1),  # level missing from api_levels
+  ], columns=['codepoints', 'api_level', 'supported'])
+  font_summary = pd.DataFrame([
+    (21, 80, 25.0),
+    (28, 200, 40.0),
+  ], columns=['api_level', 'num_files', 'size_MB'])
+  api_levels = {
+    21: ("Lollipop", "5.0"),
+    27: ("Oreo", "8.1.0"),
+    28: ("Pie", "9"),
+  }
+  return support_server.SupportIndex(detail, font_summary, api_levels)
+
+
+@pytest.mark.parametrize(
+  "cp_seq, api_level, expected_result",
+  [
+    ((0x1f970,), 27, False),
+    ((0x1f970,), 28, True),
+    ((0x263A,), 21, True),
+    ((0x263A,), 27, False),  # not in dataset for the level
+    ((0x1f970,), 33, True),
+    ((0x263A,), 33, False),
+    ((0x1f600,), 28, None),  # not in dataset at all
+  ],
+)
+def test_index_supports(cp_seq, api_level, expected_result):
+  assert _index().supports(cp_seq, api_level) == expected_result
+
+
+def test_index_unknown_level():
+  assert _index().supports((0x1f970,), 20) is None
+
+
+def test_index_levels():
+  levels = _index().levels()
+  assert sorted(levels) == [21, 27, 28, 33]
+  assert levels[28]['name'] == 'Pie'
+  assert levels[33] == {'name': None, 'version': None, 'fonts': None}
+
+
+@pytest.mark.parametrize(
+  "value, expected_result",
+  [
+    ('1f469 1f3fb', (0x1f469, 0x1f3fb)),
+    ('1f469_1f3fb', (0x1f469, 0x1f3fb)),
+    ([0x1f970], (0x1f970,)),
+  ],
+)
+def test_parse_codepoints(value, expected_result):
+  assert support_server.parse_codepoints(value) == expected_result
+
+
+@pytest.mark.parametrize(
+  "value",
+  [
+    [True],
+    [-1],
+    [0x110000],
+    '110000',
+    '',
+    [],
+  ],
+)
+def test_parse_codepoints_rejects(value):
+  with pytest.raises(ValueError):
+    support_server.parse_codepoints(value)
+
+
+def test_latency_histogram():
+  histogram = support_server.LatencyHistogram(bounds_us=(10, 100, 1000))
+  for seconds in (5e-6, 50e-6, 50e-6, 2e-3):
+    histogram.record('x', seconds)
+  snapshot = histogram.snapshot()['x']
+  assert snapshot['count'] == 4
+  assert snapshot['p50_us'] == 100
+  assert snapshot['p99_us'] is None  # overflow bucket
+  assert snapshot['buckets'] == [
+    {'le_us': 10, 'count': 1},
+    {'le_us': 100, 'count': 2},
+    {'le_us': None, 'count': 1},
+  ]
+
+
+def test_server_batch():
+  server = support_server.make_server(_index(), 'localhost', 0)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  url = 'http://%s:%d' % server.server_address[:2]
+  try:
+    body = json.dumps({'queries': [
+      {'codepoints': '1f970', 'api_level': 28},
+      {'codepoints': [0x1f970], 'api_level': 27},
+      {'codepoints': '1f970', 'api_level': 20},  # unknown level
+    ]}).encode('utf-8')
+    with urllib.request.urlopen(url + '/supports', data=body) as response:
+      results = json.loads(response.read())['results']
+    assert [r['supported'] for r in results] == [True, False, None]
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+      urllib.request.urlopen(url + '/supports', data=b'{"queries": 1}')
+    assert e.value.code == 400
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+      body = json.dumps({'queries': [
+        {'codepoints': '1f970', 'api_level': 28},
+        {'codepoints': '', 'api_level': 28},
+      ]}).encode('utf-8')
+      urllib.request.urlopen(url + '/supports', data=body)
+    assert e.value.code == 400
+    assert 'query 1' in json.loads(e.value.read())['error']
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+      body = json.dumps({'queries': [
+        {'codepoints': '1f970', 'api_level': True},
+      ]}).encode('utf-8')
+      urllib.request.urlopen(url + '/supports', data=body)
+    assert e.value.code == 400
+
+    with urllib.request.urlopen(url + '/latency') as response:
+      latency = json.loads(response.read())
+    assert latency['POST /supports']['count'] == 4
+  finally:
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+  "content_length, expected_status",
+  [
+    (-1, 400),
+    (support_server._MAX_BODY_BYTES + 1, 413),
+  ],
+)
+def test_server_bad_content_length(content_length, expected_status):
+  server = support_server.make_server(_index(), 'localhost', 0)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  host, port = server.server_address[:2]
+  try:
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    connection.putrequest('POST', '/supports')
+    connection.putheader('Content-Length', str(content_length))
+    connection.endheaders()
+    assert connection.getresponse().status == expected_status
+    connection.close()
+  finally:
+    server.shutdown()
+    server.server_close()